@@ -3,10 +3,17 @@ SF Legends .sff Unpacker — Desktop GUI
 Run: python app.py
 """
 
+import array
+import errno
+import itertools
+import mmap
 import struct
 import os
+import sys
 import threading
+import time
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
 
@@ -16,6 +23,12 @@ try:
 except ImportError:
     HAS_DND = False
 
+# Only Linux can sendfile() into a regular file
+HAS_SENDFILE = sys.platform.startswith("linux")
+# Access-pattern hints; madvise()/posix_fadvise() don't exist on Windows
+HAS_MADVISE = hasattr(mmap, "MADV_WILLNEED")
+HAS_FADVISE = hasattr(os, "posix_fadvise")
+
 
 # ─────────────────────────────────────────────
 #  Color palette & fonts
@@ -40,65 +53,224 @@ FONT_SMALL = ("Segoe UI", 8)
 # ─────────────────────────────────────────────
 #  Core unpacker logic
 # ─────────────────────────────────────────────
-def parse_sff(filepath):
-    """Returns list of {filename, size} dicts + data_offset."""
-    with open(filepath, "rb") as f:
-        data = f.read()
+# One header record: u32 size, NUL-padded name, 4 trailing bytes
+_ENTRY = struct.Struct("<I128s4x")
+_READ_BUFFER = 128 * 1024
+_COPY_CHUNK = 1 << 20  # max bytes per write() when sendfile isn't available
+_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def _iter_headers(f):
+    """Yield (size, name_bytes) for each complete header record in f."""
+    chunk_size = _READ_BUFFER - _READ_BUFFER % _ENTRY.size
+    while True:
+        chunk = f.read(chunk_size)
+        yield from _ENTRY.iter_unpack(chunk[:len(chunk) - len(chunk) % _ENTRY.size])
+        if len(chunk) < chunk_size:
+            return
 
-    ENTRY_SIZE = 136
-    entries = []
+
+def parse_sff(filepath):
+    """Returns (names, sizes, data_offset, total_size).
+
+    names is a list of str and sizes a parallel array of u32, which is much
+    lighter than one dict per entry on archives with many files.
+    """
+    ENTRY_SIZE = _ENTRY.size
+    names = []
+    sizes = array.array("I")
     offset = 0
+    total_size = 0
+
+    # The header table is a small prefix of the archive, so stream it in
+    # large chunks instead of loading (or mapping) the whole file
+    with open(filepath, "rb", buffering=_READ_BUFFER) as f:
+        if HAS_FADVISE:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        for size, name_bytes in _iter_headers(f):
+            if size == 0 or size == 0xCCCCCCCC:
+                break
+
+            filename = name_bytes.partition(b"\x00")[0].decode("ascii", errors="replace")
+            if not filename:
+                break
+
+            names.append(filename)
+            sizes.append(size)
+            offset += ENTRY_SIZE
+            total_size += size
+
+    return names, sizes, offset, total_size  # data_offset = offset
+
+
+# Drops control characters and everything Windows rejects in a path
+# component; separators are kept, normalized to "/"
+_INVALID_CHARS = str.maketrans(
+    "\\", "/", "".join(map(chr, range(0x20))) + "\x7f" + ':*?"<>|')
+
+
+def _clean_path(filename):
+    """Split an archive path into parts that are valid on Windows.
+
+    Components left empty after cleaning become "_unnamed". Returns None if
+    no component has a usable name.
+    """
+    parts = [p.strip() or "_unnamed"
+             for p in filename.translate(_INVALID_CHARS).split("/")]
+
+    # Skip if the filename looks corrupted (too short or all underscores)
+    if not any(p != "_unnamed" for p in parts):
+        return None
+    return parts
+
+
+def _advise(src_map, option, offset, size):
+    """madvise() the page-aligned span covering size bytes at offset."""
+    start = offset - offset % mmap.PAGESIZE
+    if start < len(src_map):
+        src_map.madvise(option, start, offset + size - start)
+
+
+def _write_mapped(src_map, out_fd, offset, size):
+    """Write size bytes at offset in the mapped archive to out_fd."""
+    if HAS_MADVISE:
+        # Start readahead for the whole entry before copying it
+        _advise(src_map, mmap.MADV_WILLNEED, offset, size)
+
+    # Raw 1 MiB writes straight from the mapped pages. Slicing a
+    # memoryview copies nothing, so no buffer is allocated per chunk.
+    # Each slice is released right away: one left alive (e.g. by the
+    # traceback of a failed write) would stop the mapping from closing.
+    with memoryview(src_map) as view:
+        pos, end = offset, offset + size
+        while pos < end:
+            with view[pos:min(pos + _COPY_CHUNK, end)] as chunk:
+                if not chunk:  # truncated archive
+                    break
+                pos += os.write(out_fd, chunk)
+
+    if HAS_MADVISE:
+        # Each entry is read exactly once; unmap its pages again
+        _advise(src_map, mmap.MADV_DONTNEED, offset, size)
+
+
+def _copy_range(src_fd, src_map, out_fd, offset, size):
+    """Copy size bytes at offset in the source archive to out_fd."""
+    if HAS_SENDFILE:
+        if HAS_FADVISE:
+            # sendfile reads through the descriptor, not the mapping
+            os.posix_fadvise(src_fd, offset, size, os.POSIX_FADV_WILLNEED)
+
+        # Kernel-side copy, the data never enters Python
+        pos, remaining = offset, size
+        try:
+            while remaining > 0:
+                sent = os.sendfile(out_fd, src_fd, pos, remaining)
+                if sent == 0:  # truncated archive
+                    break
+                pos += sent
+                remaining -= sent
+            return
+        except OSError as err:
+            # As in shutil's sendfile fast path: if nothing was sent yet
+            # (EOVERFLOW past a filesystem's size limit, EINVAL, ENOSYS...),
+            # retry this entry with plain writes; otherwise it's a real error
+            if pos != offset or err.errno == errno.ENOSPC:
+                raise
 
-    while offset + ENTRY_SIZE <= len(data):
-        size = struct.unpack("<I", data[offset:offset + 4])[0]
-        if size == 0 or size == 0xCCCCCCCC:
-            break
+    _write_mapped(src_map, out_fd, offset, size)
 
-        name_bytes = data[offset + 4:offset + 132]
-        filename = name_bytes.split(b"\x00")[0].decode("ascii", errors="replace")
-        if not filename:
-            break
 
-        entries.append({"filename": filename, "size": size})
-        offset += ENTRY_SIZE
+def _output_key(out_path):
+    """Key shared by every path that may resolve to the same output file.
 
-    return entries, offset  # data_offset = offset
+    Resolves ".." and ignores case and the trailing dots/spaces Windows drops,
+    so "x\\..\\Y.bin." and "y.bin" get the same key. Over-matching only costs
+    parallelism, never correctness.
+    """
+    path = os.path.normcase(os.path.normpath(out_path))
+    return tuple(p.rstrip(". ").casefold() for p in path.split(os.sep))
 
 
-def sanitize_filename(filename):
-    """Remove or replace characters invalid on Windows."""
-    # Remove non-printable / control characters
-    cleaned = "".join(c for c in filename if c.isprintable() and c not in r'\/:*?"<>|')
-    return cleaned.strip() or "_unnamed"
+def _write_entries(src_fd, src_map, group):
+    """Write (out_path, offset, size) entries in order. Safe to run from
+    several threads, as long as no two groups share an output file."""
+    out_flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    for out_path, offset, size in group:
+        out_fd = os.open(out_path, out_flags, 0o666)
+        try:
+            _copy_range(src_fd, src_map, out_fd, offset, size)
+        finally:
+            os.close(out_fd)
 
 
-def extract_all(filepath, entries, data_offset, output_dir, progress_cb=None):
-    """Extract all entries to output_dir. Calls progress_cb(i, total) each step."""
-    total = len(entries)
-    skipped = 0
-    with open(filepath, "rb") as f:
-        f.seek(data_offset)
-        for i, entry in enumerate(entries):
-            file_data = f.read(entry["size"])
-
-            # Split path parts and sanitize each one
-            parts = entry["filename"].replace("\\", "/").split("/")
-            parts = [sanitize_filename(p) for p in parts]
-
-            # Skip if the filename looks corrupted (too short or all underscores)
-            if all(p in ("", "_unnamed") for p in parts):
-                skipped += 1
-                if progress_cb:
-                    progress_cb(i + 1, total)
-                continue
+def extract_all(filepath, names, sizes, data_offset, output_dir, progress_cb=None):
+    """Extract all entries to output_dir. Returns the number skipped.
 
+    Calls progress_cb(done, total) as entries finish. Skipped entries are
+    reported in one step up front, and the rest in completion order, which
+    is not archive order.
+    """
+    total = len(names)
+    skipped = 0
+    if not names:
+        return skipped
+
+    # Resolve every output path first so writes can be grouped by directory.
+    # Entries that may land on the same file share a job and are written in
+    # archive order, so the last one wins as in a sequential extract and two
+    # threads never write the same file.
+    jobs = {}
+    offsets = itertools.accumulate(sizes, initial=data_offset)
+    for filename, size, offset in zip(names, sizes, offsets):
+        parts = _clean_path(filename)
+        if parts is None:
+            skipped += 1
+        else:
             out_path = Path(output_dir).joinpath(*parts)
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(out_path, "wb") as out:
-                out.write(file_data)
-
-            if progress_cb:
-                progress_cb(i + 1, total)
+            jobs.setdefault(_output_key(out_path), []).append((out_path, offset, size))
+
+    done = skipped
+    if done and progress_cb:
+        progress_cb(done, total)
+
+    # Group writes by directory. Aliases of one file are already in a single
+    # job, so reordering jobs can't change which entry wins.
+    jobs = sorted(jobs.values(), key=lambda group: group[-1][0].parent)
+
+    # Entries are independent (own source range, own output file), so copy
+    # them on a thread pool. sendfile and os.write release the GIL.
+    created_dirs = set()
+    # Every read is positional (sendfile offset or mapping slice), so the
+    # source only needs a bare descriptor, never a seek pointer
+    src_fd = os.open(filepath, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        with mmap.mmap(src_fd, 0, access=mmap.ACCESS_READ) as src_map, \
+                ThreadPoolExecutor(max_workers=_MAX_WORKERS) as pool:
+            futures = {}
+            try:
+                for group in jobs:
+                    for out_path, _, _ in group:
+                        if out_path.parent not in created_dirs:
+                            out_path.parent.mkdir(parents=True, exist_ok=True)
+                            created_dirs.add(out_path.parent)
+                    future = pool.submit(_write_entries, src_fd, src_map, group)
+                    futures[future] = len(group)
+
+                # Report progress from this thread only, so progress_cb
+                # needn't be thread-safe
+                for future in as_completed(futures):
+                    future.result()
+                    done += futures[future]
+                    if progress_cb:
+                        progress_cb(done, total)
+            except BaseException:
+                # Stop at the first failure like a sequential extract would,
+                # instead of copying the rest of the queue first
+                pool.shutdown(cancel_futures=True)
+                raise
+    finally:
+        os.close(src_fd)
 
     return skipped
 
@@ -116,7 +288,8 @@ class SFFApp:
         self.root.resizable(True, True)
 
         self.current_file = None
-        self.entries = []
+        self.names = []
+        self.sizes = array.array("I")
         self.data_offset = 0
 
         self._build_ui()
@@ -331,34 +504,42 @@ class SFFApp:
             self._set_status(f"Parsing {Path(path).name}…")
             self.root.update()
 
-            entries, data_offset = parse_sff(path)
+            names, sizes, data_offset, total_size = parse_sff(path)
             self.current_file = path
-            self.entries = entries
+            self.names = names
+            self.sizes = sizes
             self.data_offset = data_offset
 
-            self._populate_tree(entries)
+            self._populate_tree(names, sizes)
             self._update_drop_zone_loaded(path)
 
-            total_size = sum(e["size"] for e in entries)
             self.list_title.config(text=Path(path).name, fg=GREEN)
             self.count_label.config(
-                text=f"{len(entries)} files  ·  {total_size / 1024:.1f} KB total")
+                text=f"{len(names)} files  ·  {total_size / 1024:.1f} KB total")
 
             self.extract_btn.config(state="normal")
-            self._set_status(f"✔  Loaded {len(entries)} files from {Path(path).name}")
+            self._set_status(f"✔  Loaded {len(names)} files from {Path(path).name}")
 
         except Exception as e:
             self._set_status(f"Error: {e}", error=True)
 
-    def _populate_tree(self, entries):
-        self.tree.delete(*self.tree.get_children())
-        for i, entry in enumerate(entries):
-            ext = Path(entry["filename"]).suffix.lstrip(".").upper() or "—"
-            size_str = self._fmt_size(entry["size"])
-            tag = "odd" if i % 2 else "even"
-            self.tree.insert("", "end",
-                values=(entry["filename"].replace("\\", " / "), size_str, ext),
-                tags=(tag,))
+    def _populate_tree(self, names, sizes):
+        # Unmap the tree while filling it so Tk lays it out once, not per row.
+        # It is the last widget packed in its container, so re-packing puts
+        # it back in the same spot.
+        self.tree.pack_forget()
+        try:
+            self.tree.delete(*self.tree.get_children())
+            fmt_size, file_ext = self._fmt_size, self._file_ext
+            for i, (filename, size) in enumerate(zip(names, sizes)):
+                ext = file_ext(filename)
+                size_str = fmt_size(size)
+                tag = "odd" if i % 2 else "even"
+                self.tree.insert("", "end",
+                    values=(filename.replace("\\", " / "), size_str, ext),
+                    tags=(tag,))
+        finally:
+            self.tree.pack(fill="both", expand=True)
 
     def _update_drop_zone_loaded(self, path):
         name = Path(path).name
@@ -380,7 +561,17 @@ class SFFApp:
         self._set_status("Extracting…")
 
         def run():
+            last_update = 0.0
+
             def on_progress(done, total):
+                # Redraw at most ~30 times a second; with many tiny entries
+                # Tk would otherwise dominate the extraction time
+                nonlocal last_update
+                now = time.monotonic()
+                if done < total and now - last_update < 0.033:
+                    return
+                last_update = now
+
                 pct = (done / total) * 100
                 self.progress_var.set(pct)
                 self._set_status(f"Extracting… {done}/{total}")
@@ -389,7 +580,8 @@ class SFFApp:
             try:
                 extract_all(
                     self.current_file,
-                    self.entries,
+                    self.names,
+                    self.sizes,
                     self.data_offset,
                     out_dir,
                     progress_cb=on_progress
@@ -404,11 +596,11 @@ class SFFApp:
         self.progress_var.set(100)
         self.extract_btn.config(state="normal", text="EXTRACT ALL")
         self._set_status(
-            f"✔  Extracted {len(self.entries)} files → {out_dir}")
+            f"✔  Extracted {len(self.names)} files → {out_dir}")
         self.root.after(1500, lambda: self.progress_bar.pack_forget())
         messagebox.showinfo(
             "Done!",
-            f"Extracted {len(self.entries)} files to:\n{out_dir}")
+            f"Extracted {len(self.names)} files to:\n{out_dir}")
 
     def _extraction_error(self, error):
         self.extract_btn.config(state="normal", text="EXTRACT ALL")
@@ -428,6 +620,16 @@ class SFFApp:
             return f"{n / 1024:.1f} KB"
         return f"{n} B"
 
+    @staticmethod
+    def _file_ext(filename):
+        # Extension of the last path component, without building a path
+        # object for every row. Matches PureWindowsPath(filename).suffix
+        # except that "." components and drive prefixes ("c:") aren't
+        # special-cased; neither occurs in real archive names.
+        base = filename.rstrip("\\/").rpartition("\\")[2].rpartition("/")[2]
+        stem, _, ext = base.rpartition(".")
+        return ext.upper() if stem and ext else "—"
+
 
 # ─────────────────────────────────────────────
 #  Entry point